@@ -0,0 +1,219 @@
+"""
+Representación compacta del catálogo de canciones.
+
+Las páginas de Streamlit cargan el mismo CSV en cada worker. Con los tipos por
+defecto de pandas (float64 para los porcentajes y objetos de Python para los
+textos) el DataFrame es mucho más grande de lo necesario, así que aquí se
+centraliza la carga con tipos ajustados:
+
+* Porcentajes de audio y contadores -> enteros sin signo del tamaño mínimo.
+* Tonalidad, modo, género y subgénero -> categóricas (códigos + diccionario).
+* Artistas -> categóricas y, además, un índice (fila, id_artista) para filtrar
+  sin recorrer las cadenas con ``apply``.
+
+Para que el primer request no tenga que parsear el CSV se puede precompilar un
+bundle (pickle del DataFrame ya compactado, con las coordenadas del mapa de
+``mapa_embedding.py`` y los clusters de ``duplicados.py``). ``cargar_catalogo``
+lo usa si existe y es más reciente que el CSV.
+
+Uso desde terminal:
+
+    python catalogo.py [ruta_csv]            # reporte de memoria antes/después
+    python catalogo.py --bundle [ruta_csv]   # genera el bundle precompilado
+    python catalogo.py --bundle --mapa svd_aleatorio [ruta_csv]
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+RUTA_CSV = 'df_songs_all_con_genero_subgenero.csv'
+EXTENSION_BUNDLE = '.bundle.pkl'
+
+# Características de audio usadas por el recomendador y las gráficas
+AUDIO_FEATURES = ['bpm', 'danceability_%', 'valence_%', 'energy_%',
+                  'acousticness_%', 'instrumentalness_%', 'liveness_%', 'speechiness_%']
+
+COLS_RECS = ['id_rec_1', 'id_rec_2', 'id_rec_3', 'id_rec_4', 'id_rec_5']
+
+COLS_NUMERICAS = [
+    'id_song', *COLS_RECS, *AUDIO_FEATURES,
+    'streams', 'in_spotify_playlists', 'in_spotify_charts', 'in_apple_playlists',
+    'in_apple_charts', 'in_deezer_playlists', 'in_deezer_charts', 'in_shazam_charts'
+]
+
+# dtype entero de numpy -> entero nullable de pandas (admite <NA>)
+_ENTEROS_NULLABLES = {
+    'int8': 'Int8', 'int16': 'Int16', 'int32': 'Int32', 'int64': 'Int64',
+    'uint8': 'UInt8', 'uint16': 'UInt16', 'uint32': 'UInt32', 'uint64': 'UInt64',
+}
+
+COLS_CATEGORICAS = ['et_key', 'et_mode', 'genre_inferred', 'subgenre_inferred',
+                    'artist(s)_name']
+
+
+# --- 1. CARGA ---
+
+def limpiar_numericas(df):
+    """Quita los separadores de miles y convierte a número las columnas numéricas (in place)."""
+    df.columns = df.columns.str.strip()
+
+    for col in COLS_NUMERICAS:
+        if col in df.columns:
+            if df[col].dtype == 'object':
+                df[col] = df[col].astype(str).str.replace(',', '')
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+def leer_catalogo_crudo(ruta=RUTA_CSV):
+    """Lee el CSV tal cual lo hacían las páginas (tipos por defecto de pandas)."""
+    return limpiar_numericas(pd.read_csv(ruta))
+
+
+def compactar_catalogo(df):
+    """Devuelve una copia de ``df`` con tipos compactos (ver docstring del módulo)."""
+    df = df.copy()
+
+    for col in COLS_NUMERICAS:
+        if col not in df.columns:
+            continue
+        validos = df[col].dropna()
+        # float32 no representa exactamente contadores grandes (streams > 2^24),
+        # así que las columnas no enteras se quedan en float64
+        if not (validos == validos.round()).all():
+            continue
+        signo = 'unsigned' if (validos >= 0).all() else 'integer'
+        tipo = pd.to_numeric(validos.astype(np.int64), downcast=signo).dtype
+        if len(validos) < len(df):
+            # Con faltantes: entero nullable del mismo tamaño (UInt32, Int16...)
+            df[col] = df[col].astype(_ENTEROS_NULLABLES[tipo.name])
+        else:
+            df[col] = df[col].astype(tipo)
+
+    # Columnas artist_0..artist_7 (nombres normalizados) y categóricas
+    cols_artistas = [c for c in df.columns if c.startswith('artist_')]
+    for col in COLS_CATEGORICAS + cols_artistas:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+
+def ruta_bundle(ruta=RUTA_CSV):
+    """Ruta del bundle precompilado asociado a un CSV."""
+    return os.path.splitext(ruta)[0] + EXTENSION_BUNDLE
+
+
+def generar_bundle(ruta=RUTA_CSV, metodo_mapa='auto'):
+    """
+    Compacta el CSV y lo guarda como bundle junto a él. Devuelve la ruta del bundle.
+
+    Incluye las columnas precalculadas que usa el recomendador: coordenadas del
+    mapa 2-D (``metodo_mapa`` es el método de ``mapa_embedding.proyectar``) y
+    clusters de duplicados, para que ningún worker tenga que calcularlas al
+    arrancar.
+    """
+    from duplicados import detectar_duplicados
+    from mapa_embedding import agregar_coordenadas
+
+    destino = ruta_bundle(ruta)
+    df = agregar_coordenadas(compactar_catalogo(leer_catalogo_crudo(ruta)), metodo_mapa)
+    detectar_duplicados(df).to_pickle(destino)
+    return destino
+
+
+def cargar_catalogo(ruta=RUTA_CSV):
+    """Carga el catálogo compactado, desde el bundle si está al día o desde el CSV."""
+    bundle = ruta_bundle(ruta)
+    if os.path.exists(bundle) and (
+            not os.path.exists(ruta) or os.path.getmtime(bundle) >= os.path.getmtime(ruta)):
+        return pd.read_pickle(bundle)
+    return compactar_catalogo(leer_catalogo_crudo(ruta))
+
+
+# --- 2. VISTAS DERIVADAS ---
+
+def matriz_audio(df, features=AUDIO_FEATURES, escalar=False):
+    """
+    Matriz contigua float32 (n_canciones x n_features) con las características de audio.
+
+    Con ``escalar=True`` cada columna se lleva a [0, 1] (min-max, ignorando NaN),
+    que es la escala que usan el recomendador, el mapa y la detección de duplicados.
+    """
+    X = np.ascontiguousarray(df[features].to_numpy(dtype=np.float32))
+    if escalar:
+        minimo, maximo = np.nanmin(X, axis=0), np.nanmax(X, axis=0)
+        X = (X - minimo) / np.where(maximo > minimo, maximo - minimo, 1)
+    return X
+
+
+def codificar_artistas(df):
+    """
+    Codifica los artistas individuales como ids enteros.
+
+    Las colaboraciones ("Drake, 21 Savage") se separan en artistas individuales.
+
+    Returns:
+        vocabulario: Lista ordenada de nombres; la posición es el id del artista.
+        pares: DataFrame con columnas ``fila`` (posición en ``df``) e
+            ``id_artista``, una fila por cada par canción-artista.
+    """
+    artistas = df['artist(s)_name'].astype(str).str.split(',').explode().str.strip()
+    codigos, vocabulario = pd.factorize(artistas, sort=True)
+
+    # La posición de la fila se obtiene de la repetición de cada canción al explotar
+    filas = np.repeat(np.arange(len(df)), df['artist(s)_name'].astype(str).str.count(',') + 1)
+    pares = pd.DataFrame({
+        'fila': filas.astype(np.int32),
+        'id_artista': codigos.astype(np.int32),
+    })
+    return list(vocabulario), pares
+
+
+def filas_de_artista(pares, id_artista):
+    """Posiciones de las canciones en las que participa el artista ``id_artista``."""
+    return pares.loc[pares['id_artista'] == id_artista, 'fila'].to_numpy()
+
+
+def etiqueta_busqueda(df, idx):
+    """Etiqueta "Canción - Artista" de la fila ``idx``, calculada solo cuando se pide."""
+    return f"{df.at[idx, 'track_name']} - {df.at[idx, 'artist(s)_name']}"
+
+
+# --- 3. REPORTE DE MEMORIA ---
+
+def reporte_memoria(df_antes, df_despues):
+    """Bytes por columna antes y después de compactar (incluye el contenido de los objetos)."""
+    antes = df_antes.memory_usage(deep=True, index=False)
+    despues = df_despues.memory_usage(deep=True, index=False)
+    reporte = pd.DataFrame({
+        'dtype_antes': df_antes.dtypes.astype(str),
+        'dtype_despues': df_despues.dtypes.reindex(df_antes.columns).astype(str),
+        'bytes_antes': antes,
+        'bytes_despues': despues.reindex(antes.index),
+    })
+    reporte.loc['TOTAL', ['bytes_antes', 'bytes_despues']] = [antes.sum(), despues.sum()]
+    reporte['ahorro_%'] = 100 * (1 - reporte['bytes_despues'] / reporte['bytes_antes'])
+    return reporte
+
+
+if __name__ == '__main__':
+    from mapa_embedding import METODOS
+
+    parser = argparse.ArgumentParser(description="Reporte de memoria o bundle precompilado del catálogo.")
+    parser.add_argument('ruta', nargs='?', default=RUTA_CSV)
+    parser.add_argument('--bundle', action='store_true', help="Genera el bundle precompilado")
+    parser.add_argument('--mapa', default='auto', choices=METODOS,
+                        help="Método de proyección del mapa 2-D del bundle")
+    args = parser.parse_args()
+    if args.bundle:
+        print(f"Bundle generado: {generar_bundle(args.ruta, args.mapa)}")
+        raise SystemExit
+
+    crudo = leer_catalogo_crudo(args.ruta)
+    crudo['search_label'] = crudo['track_name'] + " - " + crudo['artist(s)_name']
+    compacto = compactar_catalogo(crudo.drop(columns='search_label'))
+    with pd.option_context('display.max_rows', None, 'display.max_columns', None,
+                           'display.width', 120):
+        print(reporte_memoria(crudo, compacto).round(1))
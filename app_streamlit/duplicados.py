@@ -0,0 +1,206 @@
+"""
+Detección de canciones casi duplicadas.
+
+``hit_prediction_regression.ipynb`` elimina duplicados con
+``drop_duplicates(subset='track_name')``, lo que junta canciones distintas con
+el mismo título ("Miss You" de dos artistas) y deja pasar reediciones cuyo
+nombre cambia por acentos o por un "(feat. ...)". Aquí, en tiempo casi lineal:
+
+1. Se normalizan título y artistas y se parten en shingles de caracteres.
+2. MinHash + LSH por bandas proponen candidatos (sin comparar todos los pares).
+3. Cada candidato se confirma comparando solo el par: Jaccard de los títulos,
+   al menos un artista en común, los mismos números en el título ("Vol. 53"
+   frente a "Vol. 55") y la distancia entre sus características de audio.
+4. Los pares confirmados se agrupan en clusters (componentes conexas).
+
+No se elimina ninguna fila: se añaden ``cluster_duplicado`` y
+``es_representante`` (la versión con más streams de cada cluster), de modo que
+el equivalente al notebook es ``df[df['es_representante']]``.
+
+Uso desde terminal:
+
+    python duplicados.py [ruta_csv]
+"""
+import re
+import sys
+import unicodedata
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from catalogo import AUDIO_FEATURES, RUTA_CSV, leer_catalogo_crudo, matriz_audio
+
+# Primo de Mersenne 2^31 - 1 para el hashing universal de MinHash: con a, h < 2^31
+# el producto a*h cabe en uint64 sin desbordar
+_PRIMO = (1 << 31) - 1
+
+# "(feat. X)", "[Remix]", " - Remastered 2011", "feat. X" sin paréntesis...
+# "with" solo se quita entre paréntesis: suelto es parte del título ("Stay With Me")
+_PARENTESIS = re.compile(r'\(.*?\)|\[.*?\]')
+_SUFIJO = re.compile(r'\s+-\s+.*$|\s+(feat|ft|featuring)\.?\s+.*$')
+_NO_ALFANUM = re.compile(r'[^a-z0-9]+')
+_NUMEROS = re.compile(r'\d+')
+
+# Columnas que añade detectar_duplicados (se guardan en el bundle de catalogo.py)
+COLS_DUPLICADOS = ['cluster_duplicado', 'es_representante']
+
+
+# --- 1. NORMALIZACIÓN Y SHINGLES ---
+
+def normalizar_texto(texto):
+    """Minúsculas, sin acentos, sin paréntesis ni sufijos "feat."/"- versión"."""
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    texto = _SUFIJO.sub('', _PARENTESIS.sub(' ', texto))
+    return _NO_ALFANUM.sub(' ', texto).strip()
+
+
+def kgramas(texto, k=3):
+    """Conjunto de k-gramas de caracteres de ``texto``."""
+    return {texto[i:i + k] for i in range(max(len(texto) - k + 1, 1))}
+
+
+def shingles(texto, k=3):
+    """Hashes (uint64) de los k-gramas de caracteres de ``texto``."""
+    grams = kgramas(texto, k)
+    return np.fromiter((zlib.crc32(g.encode()) % _PRIMO for g in grams),
+                       dtype=np.uint64, count=len(grams))
+
+
+# --- 2. MINHASH + LSH ---
+
+def firmas_minhash(claves, n_permutaciones=64, semilla=0):
+    """Matriz (n_claves x n_permutaciones) de firmas MinHash."""
+    rng = np.random.default_rng(semilla)
+    a = rng.integers(1, _PRIMO, size=n_permutaciones, dtype=np.uint64)
+    b = rng.integers(0, _PRIMO, size=n_permutaciones, dtype=np.uint64)
+
+    firmas = np.empty((len(claves), n_permutaciones), dtype=np.uint64)
+    for i, clave in enumerate(claves):
+        h = shingles(clave)
+        firmas[i] = ((np.outer(a, h) + b[:, None]) % _PRIMO).min(axis=1)
+    return firmas
+
+
+def pares_candidatos(firmas, n_bandas=16, max_cubeta=200):
+    """
+    Pares (i, j), i < j, que coinciden en al menos una banda de la firma.
+
+    Las cubetas con más de ``max_cubeta`` filas (títulos genéricos muy
+    repetidos) se ignoran para que el coste siga siendo casi lineal.
+    """
+    n, n_perm = firmas.shape
+    filas_banda = n_perm // n_bandas
+    pares = set()
+    for banda in range(n_bandas):
+        trozo = np.ascontiguousarray(firmas[:, banda * filas_banda:(banda + 1) * filas_banda])
+        _, grupo, tamanos = np.unique(trozo.view(f'V{trozo.itemsize * filas_banda}').ravel(),
+                                      return_inverse=True, return_counts=True)
+        # Filas agrupadas por cubeta: orden estable por id de cubeta y cortes por tamaño
+        por_cubeta = np.split(np.argsort(grupo.ravel(), kind='stable'), np.cumsum(tamanos)[:-1])
+        for g in np.flatnonzero((tamanos >= 2) & (tamanos <= max_cubeta)):
+            miembros = por_cubeta[g]
+            for x in range(len(miembros)):
+                for y in range(x + 1, len(miembros)):
+                    pares.add((miembros[x], miembros[y]))
+    if not pares:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.array(sorted(pares), dtype=np.int64)
+
+
+# --- 3. CONFIRMACIÓN Y CLUSTERS ---
+
+def componentes_conexas(n, i, j):
+    """
+    Etiquetas 0..k-1 de las componentes conexas del grafo con aristas (i, j).
+
+    Union-find vectorizado: cada nodo apunta a la menor raíz de sus aristas y
+    se comprimen los caminos (``raiz[raiz]``) hasta que nada cambia. Las
+    etiquetas siguen el orden del primer nodo de cada componente.
+    """
+    raiz = np.arange(n)
+    while True:
+        minimo = np.minimum(raiz[i], raiz[j])
+        nueva = raiz.copy()
+        np.minimum.at(nueva, raiz[i], minimo)
+        np.minimum.at(nueva, raiz[j], minimo)
+        nueva = nueva[nueva]
+        while not np.array_equal(nueva, nueva[nueva]):
+            nueva = nueva[nueva]
+        if np.array_equal(nueva, raiz):
+            break
+        raiz = nueva
+    return np.unique(raiz, return_inverse=True)[1]
+
+
+def _mismo_titulo_y_artista(titulo_a, titulo_b, artistas_a, artistas_b, umbral_titulo):
+    if not artistas_a & artistas_b:
+        return False
+    if set(_NUMEROS.findall(titulo_a)) != set(_NUMEROS.findall(titulo_b)):
+        return False
+    ka, kb = kgramas(titulo_a), kgramas(titulo_b)
+    return len(ka & kb) / len(ka | kb) >= umbral_titulo
+
+
+def detectar_duplicados(df, umbral_titulo=0.5, umbral_audio=0.15, n_permutaciones=64,
+                        n_bandas=16, features=AUDIO_FEATURES):
+    """
+    Devuelve una copia de ``df`` con ``cluster_duplicado`` y ``es_representante``.
+
+    Un par candidato (misma cubeta LSH) es duplicado si comparte al menos un
+    artista, sus títulos normalizados tienen los mismos números y un Jaccard de
+    trigramas >= ``umbral_titulo``, y la distancia euclídea de sus
+    características de audio (escaladas a [0, 1] y divididas entre
+    sqrt(n_features)) es <= ``umbral_audio``.
+    """
+    df = df.copy()
+    titulos = [normalizar_texto(t) for t in df['track_name']]
+    artistas = [{normalizar_texto(a) for a in str(x).split(',')} for x in df['artist(s)_name']]
+    claves = [f"{t} {' '.join(sorted(a))}" for t, a in zip(titulos, artistas)]
+    pares = pares_candidatos(firmas_minhash(claves, n_permutaciones), n_bandas)
+
+    if len(pares):
+        i, j = pares[:, 0], pares[:, 1]
+        audio = matriz_audio(df, features, escalar=True)
+        distancia = np.linalg.norm(audio[i] - audio[j], axis=1) / np.sqrt(len(features))
+
+        texto = np.array([_mismo_titulo_y_artista(titulos[a], titulos[b], artistas[a], artistas[b],
+                                                  umbral_titulo) for a, b in pares], dtype=bool)
+        confirmados = texto & (distancia <= umbral_audio)
+        i, j = i[confirmados], j[confirmados]
+    else:
+        i = j = np.empty(0, dtype=np.int64)
+
+    n = len(df)
+    etiquetas = componentes_conexas(n, i, j)
+    df['cluster_duplicado'] = etiquetas.astype(np.int32)
+
+    # Representante: la versión con más streams (como ordenar + keep='first').
+    # Se elige por posición: streams NaN cuenta como el mínimo y los empates
+    # se resuelven por la primera fila, así cada cluster tiene exactamente uno.
+    streams = (df['streams'].to_numpy(dtype=np.float64, na_value=np.nan)
+               if 'streams' in df.columns else np.zeros(n))
+    streams = np.nan_to_num(streams, nan=-np.inf)
+    orden = np.lexsort((np.arange(n), -streams, etiquetas))
+    primero = np.ones(n, dtype=bool)
+    primero[1:] = etiquetas[orden][1:] != etiquetas[orden][:-1]
+    representante = np.zeros(n, dtype=bool)
+    representante[orden[primero]] = True
+    # Exactamente un representante por cluster
+    assert np.array_equal(np.sort(etiquetas[representante]), np.unique(etiquetas))
+    df['es_representante'] = representante
+    return df
+
+
+if __name__ == '__main__':
+    ruta = sys.argv[1] if len(sys.argv) > 1 else RUTA_CSV
+    df = detectar_duplicados(leer_catalogo_crudo(ruta))
+    tamanos = df['cluster_duplicado'].map(df['cluster_duplicado'].value_counts())
+    grupos = df[tamanos > 1].sort_values(['cluster_duplicado', 'streams'], ascending=[True, False])
+
+    print(f"{len(df)} canciones, {df['es_representante'].sum()} únicas, "
+          f"{grupos['cluster_duplicado'].nunique()} grupos de duplicados\n")
+    with pd.option_context('display.width', 160, 'display.max_rows', None):
+        print(grupos[['cluster_duplicado', 'es_representante', 'track_name', 'artist(s)_name', 'streams']]
+              .to_string(index=False))
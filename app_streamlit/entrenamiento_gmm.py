@@ -0,0 +1,361 @@
+"""
+Entrenamiento incremental (mini-batch) del GMM de géneros.
+
+En ``gender_guessing_clustering.ipynb`` el ``GaussianMixture`` se ajusta con EM
+completo sobre toda la matriz y el número de componentes se elige reajustando
+desde cero. Aquí el EM es estocástico (EM online de Cappé y Moulines): cada
+mini-batch actualiza una media móvil de las estadísticas suficientes, por lo
+que se puede:
+
+* entrenar por bloques sin cargar el catálogo completo,
+* continuar desde el modelo anterior cuando llegan canciones nuevas
+  (``GMMMiniBatch.desde_modelo``), y
+* comparar el BIC de varios números de componentes en procesos paralelos.
+
+El modelo resultante se puede convertir a un ``GaussianMixture`` de
+scikit-learn con ``a_sklearn()`` para usar ``predict``/``predict_proba`` como
+en el notebook.
+
+Uso desde terminal:
+
+    python entrenamiento_gmm.py [ruta_csv] --componentes 8 10 12 14 --procesos 4 \\
+        [--inicial modelo_previo.pkl] [--guardar modelo.pkl]
+"""
+import argparse
+import copy
+import os
+import pickle
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.linalg import solve_triangular
+
+from catalogo import RUTA_CSV, limpiar_numericas
+
+# Mismas columnas y pesos que el notebook de clustering
+AUDIO_COLS = ['bpm', 'danceability_%', 'energy_%', 'valence_%', 'acousticness_%', 'instrumentalness_%']
+CONTEXT_COLS = ['released_year', 'log_streams']
+PESO_AUDIO, PESO_CONTEXTO, PESO_GENERO, PESO_MODO = 1.0, 0.7, 1.5, 1.5
+
+
+# --- 1. ESPACIO DE CARACTERÍSTICAS ---
+
+class EspacioGMM:
+    """
+    Transformación del notebook (MinMax + pesos + one-hot de género y modo) con
+    parámetros fijos, para que todos los bloques queden en el mismo espacio.
+    """
+
+    def __init__(self, minimos, maximos, generos, modos, col_modo, n_filas=0):
+        self.n_filas = n_filas
+        self.minimos = minimos
+        self.maximos = maximos
+        self.generos = list(generos)
+        self.modos = list(modos)
+        self.col_modo = col_modo
+
+    @staticmethod
+    def _preparar(df):
+        df = df.copy()
+        if 'log_streams' not in df.columns and 'streams' in df.columns:
+            df['log_streams'] = np.log1p(df['streams'])
+        return df
+
+    @classmethod
+    def desde_bloques(cls, bloques):
+        """Ajusta mínimos, máximos y categorías en una pasada sobre los bloques."""
+        minimos = maximos = None
+        generos, modos, col_modo = set(), set(), None
+        n_filas = 0
+        for bloque in bloques:
+            bloque = cls._preparar(bloque)
+            n_filas += len(bloque)
+            cols = [c for c in AUDIO_COLS + CONTEXT_COLS if c in bloque.columns]
+            mn, mx = bloque[cols].min(), bloque[cols].max()
+            minimos = mn if minimos is None else np.minimum(minimos, mn)
+            maximos = mx if maximos is None else np.maximum(maximos, mx)
+            generos.update(bloque['genre_inferred'].dropna().unique())
+            col_modo = 'mode' if 'mode' in bloque.columns else 'et_mode'
+            modos.update(bloque[col_modo].dropna().unique())
+        return cls(minimos, maximos, sorted(generos), sorted(modos), col_modo, n_filas)
+
+    @property
+    def dimension(self):
+        return len(self.minimos) + len(self.generos) + len(self.modos)
+
+    def transformar(self, df):
+        df = self._preparar(df)
+        cols = list(self.minimos.index)
+        rango = (self.maximos - self.minimos).replace(0, 1)
+        escalado = ((df[cols] - self.minimos) / rango).to_numpy(dtype=np.float64)
+        pesos = np.array([PESO_AUDIO if c in AUDIO_COLS else PESO_CONTEXTO for c in cols])
+
+        genero = pd.Categorical(df['genre_inferred'], categories=self.generos)
+        modo = pd.Categorical(df[self.col_modo], categories=self.modos)
+        return np.hstack([
+            escalado * pesos,
+            pd.get_dummies(genero).to_numpy(dtype=np.float64) * PESO_GENERO,
+            pd.get_dummies(modo).to_numpy(dtype=np.float64) * PESO_MODO,
+        ])
+
+
+# --- 2. GMM CON EM ESTOCÁSTICO ---
+
+class GMMMiniBatch:
+    """
+    Mezcla gaussiana (covarianza completa) entrenada con EM online.
+
+    Tras cada mini-batch las estadísticas suficientes (promedios por muestra)
+    se mezclan con paso ``rho_t = (t + 2) ** -kappa``; ``kappa`` en (0.5, 1]
+    controla lo rápido que se "olvida" lo anterior.
+    """
+
+    def __init__(self, n_componentes, kappa=0.6, reg_covar=1e-6, random_state=None):
+        self.n_componentes = n_componentes
+        self.kappa = kappa
+        self.reg_covar = reg_covar
+        self.random_state = random_state
+        self.t = 0
+        self._s0 = self._s1 = self._s2 = None
+
+    # Inicialización
+
+    def _estadisticas_desde_parametros(self, pesos, medias, covarianzas):
+        self._s0 = np.asarray(pesos, dtype=np.float64)
+        self._s1 = self._s0[:, None] * medias
+        self._s2 = self._s0[:, None, None] * (covarianzas + np.einsum('ki,kj->kij', medias, medias))
+        self._m_step()
+
+    def _inicializar(self, X):
+        from sklearn.cluster import kmeans_plusplus
+
+        centros, _ = kmeans_plusplus(X, self.n_componentes, random_state=self.random_state)
+        cov = np.cov(X, rowvar=False).reshape(X.shape[1], X.shape[1])
+        cov = np.broadcast_to(cov + self.reg_covar * np.eye(X.shape[1]),
+                              (self.n_componentes, *cov.shape)).copy()
+        self._estadisticas_desde_parametros(np.full(self.n_componentes, 1 / self.n_componentes),
+                                            centros, cov)
+
+    @classmethod
+    def desde_modelo(cls, modelo, pasos_previos=20, **kwargs):
+        """
+        Arranque en caliente desde un ``GMMMiniBatch`` o un ``GaussianMixture``
+        ya entrenado. Con un ``GaussianMixture`` no se conoce el historial, así
+        que ``pasos_previos`` fija cuánto pesa el modelo frente a los datos nuevos.
+        """
+        if isinstance(modelo, GMMMiniBatch):
+            return copy.deepcopy(modelo)
+
+        nuevo = cls(modelo.n_components, reg_covar=modelo.reg_covar, **kwargs)
+        nuevo._estadisticas_desde_parametros(modelo.weights_, modelo.means_, modelo.covariances_)
+        nuevo.t = pasos_previos
+        return nuevo
+
+    # EM
+
+    def _m_step(self):
+        s0 = np.maximum(self._s0, 1e-10)
+        d = self._s1.shape[1]
+        self.weights_ = s0 / s0.sum()
+        self.means_ = self._s1 / s0[:, None]
+        self.covariances_ = (self._s2 / s0[:, None, None]
+                             - np.einsum('ki,kj->kij', self.means_, self.means_)
+                             + self.reg_covar * np.eye(d))
+        self._cholesky = np.linalg.cholesky(self.covariances_)
+
+    def _log_prob_ponderada(self, X):
+        """log(peso_k) + log N(x | media_k, cov_k) para cada muestra y componente."""
+        n, d = X.shape
+        salida = np.empty((n, self.n_componentes))
+        for k in range(self.n_componentes):
+            L = self._cholesky[k]
+            z = solve_triangular(L, (X - self.means_[k]).T, lower=True)
+            log_det = 2 * np.log(np.diag(L)).sum()
+            salida[:, k] = -0.5 * (d * np.log(2 * np.pi) + log_det + (z ** 2).sum(axis=0))
+        return salida + np.log(self.weights_)
+
+    def _e_step(self, X):
+        lp = self._log_prob_ponderada(X)
+        log_norm = np.logaddexp.reduce(lp, axis=1)
+        return np.exp(lp - log_norm[:, None]), log_norm
+
+    def partial_fit(self, X):
+        """Un paso de EM online con el mini-batch ``X``."""
+        X = np.asarray(X, dtype=np.float64)
+        if self._s0 is None:
+            self._inicializar(X)
+
+        resp, _ = self._e_step(X)
+        n = len(X)
+        s0 = resp.sum(axis=0) / n
+        s1 = resp.T @ X / n
+        s2 = np.einsum('nk,ni,nj->kij', resp, X, X) / n
+
+        rho = (self.t + 2) ** -self.kappa
+        self._s0 = (1 - rho) * self._s0 + rho * s0
+        self._s1 = (1 - rho) * self._s1 + rho * s1
+        self._s2 = (1 - rho) * self._s2 + rho * s2
+        self.t += 1
+        self._m_step()
+        return self
+
+    def entrenar(self, bloques, tamano_lote=128, epocas=1, fuente=None):
+        """
+        Recorre los bloques (arrays ya transformados) en mini-batches.
+
+        Para varias épocas sobre datos que no caben en memoria, pasar ``fuente``:
+        una función sin argumentos que devuelve un iterador de bloques nuevo.
+        """
+        rng = np.random.default_rng(self.random_state)
+        for epoca in range(epocas):
+            iterable = fuente() if fuente is not None else bloques
+            for bloque in iterable:
+                orden = rng.permutation(len(bloque))
+                for inicio in range(0, len(bloque), tamano_lote):
+                    self.partial_fit(bloque[orden[inicio:inicio + tamano_lote]])
+        return self
+
+    # Inferencia y evaluación
+
+    def predict_proba(self, X):
+        return self._e_step(np.asarray(X, dtype=np.float64))[0]
+
+    def predict(self, X):
+        return self.predict_proba(X).argmax(axis=1)
+
+    def score_samples(self, X):
+        return self._e_step(np.asarray(X, dtype=np.float64))[1]
+
+    def n_parametros(self):
+        k, d = self.means_.shape
+        return (k - 1) + k * d + k * d * (d + 1) // 2
+
+    def bic(self, bloques):
+        """BIC acumulado sobre uno o varios bloques (un array también sirve)."""
+        if isinstance(bloques, np.ndarray):
+            bloques = [bloques]
+        log_v, n = 0.0, 0
+        for bloque in bloques:
+            log_v += self.score_samples(bloque).sum()
+            n += len(bloque)
+        return -2 * log_v + self.n_parametros() * np.log(n)
+
+    def a_sklearn(self):
+        """``GaussianMixture`` de scikit-learn con los parámetros aprendidos."""
+        from sklearn.mixture import GaussianMixture
+
+        gmm = GaussianMixture(n_components=self.n_componentes, covariance_type='full',
+                              reg_covar=self.reg_covar, random_state=self.random_state)
+        d = self.means_.shape[1]
+        gmm.weights_ = self.weights_
+        gmm.means_ = self.means_
+        gmm.covariances_ = self.covariances_
+        gmm.precisions_cholesky_ = np.stack([
+            solve_triangular(L, np.eye(d), lower=True).T for L in self._cholesky])
+        gmm.precisions_ = np.einsum('kij,klj->kil', gmm.precisions_cholesky_, gmm.precisions_cholesky_)
+        gmm.converged_ = True
+        gmm.n_iter_ = self.t
+        gmm.lower_bound_ = -np.inf
+        gmm.n_features_in_ = d
+        return gmm
+
+
+# --- 3. SELECCIÓN DEL NÚMERO DE COMPONENTES EN PARALELO ---
+
+TAMANO_BLOQUE_NPY = 100_000
+
+
+def _bloques_npy(X):
+    return (X[i:i + TAMANO_BLOQUE_NPY] for i in range(0, len(X), TAMANO_BLOQUE_NPY))
+
+
+def _entrenar_y_evaluar(ruta_npy, k, tamano_lote, epocas, random_state):
+    X = np.load(ruta_npy, mmap_mode='r')
+    modelo = GMMMiniBatch(k, random_state=random_state)
+    modelo.entrenar(None, tamano_lote, epocas, fuente=lambda: _bloques_npy(X))
+    return k, modelo.bic(_bloques_npy(X)), modelo
+
+
+def escribir_npy(espacio, bloques, ruta_npy):
+    """Transforma los bloques y los escribe en un ``.npy`` en disco, sin juntarlos en memoria."""
+    X = np.lib.format.open_memmap(ruta_npy, mode='w+', dtype=np.float64,
+                                  shape=(espacio.n_filas, espacio.dimension))
+    inicio = 0
+    for bloque in bloques:
+        Xb = espacio.transformar(bloque)
+        X[inicio:inicio + len(Xb)] = Xb
+        inicio += len(Xb)
+    X.flush()
+    return ruta_npy
+
+
+def seleccionar_componentes(X, candidatos, procesos=None, tamano_lote=128, epocas=20,
+                            random_state=42):
+    """
+    Entrena un modelo por cada número de componentes en ``candidatos`` (en
+    procesos separados) y devuelve ``(tabla_bic, modelos)``.
+
+    ``X`` puede ser un array o la ruta de un ``.npy``; los workers lo abren con
+    ``mmap_mode='r'`` en lugar de recibir una copia cada uno.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        if isinstance(X, str):
+            ruta_npy = X
+        else:
+            ruta_npy = os.path.join(tmp, 'X.npy')
+            np.save(ruta_npy, np.asarray(X, dtype=np.float64))
+        with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+            futuros = [ejecutor.submit(_entrenar_y_evaluar, ruta_npy, k, tamano_lote, epocas,
+                                       random_state) for k in candidatos]
+            resultados = [f.result() for f in futuros]
+
+    tabla = pd.DataFrame([(k, bic) for k, bic, _ in resultados],
+                         columns=['n_componentes', 'bic']).set_index('n_componentes')
+    return tabla, {k: modelo for k, _, modelo in resultados}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entrenamiento mini-batch del GMM de géneros.")
+    parser.add_argument('ruta', nargs='?', default=RUTA_CSV)
+    parser.add_argument('--componentes', type=int, nargs='+', default=[12])
+    parser.add_argument('--procesos', type=int, default=None)
+    parser.add_argument('--lote', type=int, default=128)
+    parser.add_argument('--epocas', type=int, default=20)
+    parser.add_argument('--chunk', type=int, default=100_000)
+    parser.add_argument('--inicial', help="Modelo previo (pickle) para arranque en caliente")
+    parser.add_argument('--guardar', help="Ruta donde guardar el modelo (pickle)")
+    args = parser.parse_args()
+
+    def leer_bloques():
+        return (limpiar_numericas(b) for b in pd.read_csv(args.ruta, chunksize=args.chunk))
+
+    if args.inicial:
+        # Continuar el modelo previo con las canciones del CSV, en su mismo espacio
+        with open(args.inicial, 'rb') as f:
+            espacio, previo = pickle.load(f)
+        modelo = GMMMiniBatch.desde_modelo(previo)
+        modelo.entrenar(None, args.lote, args.epocas,
+                        fuente=lambda: (espacio.transformar(b) for b in leer_bloques()))
+        print(f"Modelo actualizado: {modelo.n_componentes} componentes, {modelo.t} pasos")
+    else:
+        espacio = EspacioGMM.desde_bloques(leer_bloques())
+        with tempfile.TemporaryDirectory() as tmp:
+            ruta_npy = escribir_npy(espacio, leer_bloques(), os.path.join(tmp, 'X.npy'))
+            tabla, modelos = seleccionar_componentes(ruta_npy, args.componentes, args.procesos,
+                                                     args.lote, args.epocas)
+        print(tabla.round(1))
+        modelo = modelos[tabla['bic'].idxmin()]
+        print(f"Mejor número de componentes (BIC): {modelo.n_componentes}")
+
+    if args.guardar:
+        with open(args.guardar, 'wb') as f:
+            pickle.dump((espacio, modelo), f)
+
+
+if __name__ == '__main__':
+    # Se ejecuta desde el módulo importado para que los pickles referencien
+    # ``entrenamiento_gmm.GMMMiniBatch`` y no ``__main__.GMMMiniBatch``
+    from entrenamiento_gmm import main
+    main()
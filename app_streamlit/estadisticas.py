@@ -0,0 +1,351 @@
+"""
+Estadísticas suficientes en streaming para correlaciones y outliers.
+
+Todo lo de este módulo se calcula por bloques (chunks) y los resultados
+parciales se pueden combinar, así que sirve tanto para el DataFrame ya cargado
+de la app como para perfilar volcados históricos de varios GB sin cargarlos:
+
+* ``Momentos``: medias y matriz de co-momentos (Welford / Chan et al.), de donde
+  salen la covarianza y la correlación de Pearson.
+* ``TDigest``: sketch de cuantiles combinable; sustituye a las dos llamadas a
+  ``quantile`` por columna de ``outliers_iqr``.
+* ``Perfil``: junta ambos para un conjunto de columnas.
+
+Uso desde terminal:
+
+    python estadisticas.py ruta.csv [--chunk 100000] [--procesos 4] [--spearman]
+"""
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from catalogo import AUDIO_FEATURES, limpiar_numericas
+
+# Columnas del reporte de outliers (las mismas que en hit_prediction_regression.ipynb)
+COLS_OUTLIERS = ['streams', 'in_spotify_playlists', 'in_spotify_charts',
+                 'in_apple_playlists', 'in_deezer_playlists', 'in_apple_charts']
+
+
+# --- 1. MOMENTOS (WELFORD) ---
+
+class Momentos:
+    """Medias y co-momentos de ``d`` variables, actualizables por bloques y combinables."""
+
+    def __init__(self, d):
+        self.n = 0
+        self.media = np.zeros(d)
+        self.m2 = np.zeros((d, d))
+
+    def _fusionar(self, n_b, media_b, m2_b):
+        if n_b == 0:
+            return
+        n = self.n + n_b
+        delta = media_b - self.media
+        self.m2 += m2_b + np.outer(delta, delta) * (self.n * n_b / n)
+        self.media += delta * (n_b / n)
+        self.n = n
+
+    def actualizar(self, X):
+        """Añade un bloque (n_filas x d). Las filas con algún NaN se ignoran."""
+        X = np.asarray(X, dtype=np.float64)
+        X = X[~np.isnan(X).any(axis=1)]
+        if len(X) == 0:
+            return self
+        media_b = X.mean(axis=0)
+        centrado = X - media_b
+        self._fusionar(len(X), media_b, centrado.T @ centrado)
+        return self
+
+    def combinar(self, otro):
+        """Incorpora los momentos de otro bloque/worker."""
+        self._fusionar(otro.n, otro.media, otro.m2)
+        return self
+
+    def covarianza(self, ddof=1):
+        return self.m2 / max(self.n - ddof, 1)
+
+    def correlacion(self):
+        cov = self.covarianza()
+        desv = np.sqrt(np.diag(cov))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return cov / np.outer(desv, desv)
+
+
+# --- 2. CUANTILES (T-DIGEST) ---
+
+class TDigest:
+    """
+    Sketch de cuantiles t-digest (variante "merging").
+
+    Los centroides se agrupan con la función de escala k1, que permite centroides
+    pequeños en las colas (donde están los límites de outliers) y grandes en el
+    centro. ``compresion`` controla el tamaño: ~compresion/2 centroides.
+
+    Mientras el total de valores no supera ``20 * compresion`` se guardan los
+    valores tal cual (``exacto``) y los cuantiles coinciden con los de pandas,
+    así que con el DataFrame de la app los resultados son los del notebook.
+    """
+
+    def __init__(self, compresion=200):
+        self.compresion = compresion
+        self.medias = np.empty(0)
+        self.pesos = np.empty(0)
+        self.minimo = np.inf
+        self.maximo = -np.inf
+        self.exacto = True
+        self._buffer = []
+        self._n_buffer = 0
+
+    @property
+    def n(self):
+        return self.pesos.sum() + self._n_buffer
+
+    def actualizar(self, valores):
+        """Añade valores (se ignoran los NaN)."""
+        v = np.asarray(valores, dtype=np.float64).ravel()
+        v = v[~np.isnan(v)]
+        if v.size == 0:
+            return self
+        self.minimo = min(self.minimo, v.min())
+        self.maximo = max(self.maximo, v.max())
+        self._buffer.append(v)
+        self._n_buffer += v.size
+        if self._n_buffer >= 20 * self.compresion:
+            self._comprimir()
+        return self
+
+    def combinar(self, otro):
+        """Incorpora otro sketch (por ejemplo, el de otro worker)."""
+        otro._comprimir()
+        self.minimo = min(self.minimo, otro.minimo)
+        self.maximo = max(self.maximo, otro.maximo)
+        self._comprimir(otro.medias, otro.pesos)
+        return self
+
+    def _comprimir(self, medias_extra=None, pesos_extra=None):
+        medias = [self.medias, *self._buffer]
+        pesos = [self.pesos, *(np.ones(b.size) for b in self._buffer)]
+        if medias_extra is not None:
+            medias.append(medias_extra)
+            pesos.append(pesos_extra)
+        medias = np.concatenate(medias)
+        pesos = np.concatenate(pesos)
+        self._buffer, self._n_buffer = [], 0
+        if medias.size == 0:
+            return
+
+        orden = np.argsort(medias, kind='stable')
+        medias, pesos = medias[orden], pesos[orden]
+        total = pesos.sum()
+
+        # Pocos valores y todos sin agrupar: se guardan tal cual
+        self.exacto = total <= 20 * self.compresion and bool((pesos == 1).all())
+        if self.exacto:
+            self.medias, self.pesos = medias, pesos
+            return
+
+        # Cada centroide abarca como mucho una unidad de k1(q); asignamos cada
+        # punto al "cajón" entero de k en el que empieza y agregamos por cajón.
+        q_izq = (np.cumsum(pesos) - pesos) / total
+        k = self.compresion / (2 * np.pi) * np.arcsin(2 * q_izq - 1)
+        cajon = np.floor(k - k[0]).astype(np.int64)
+        pesos_c = np.bincount(cajon, weights=pesos)
+        suma_c = np.bincount(cajon, weights=pesos * medias)
+        ocupados = pesos_c > 0
+        self.pesos = pesos_c[ocupados]
+        self.medias = suma_c[ocupados] / self.pesos
+
+    def _puntos(self):
+        """Medias de los centroides y su posición acumulada, con los extremos."""
+        self._comprimir()
+        total = self.pesos.sum()
+        posiciones = np.cumsum(self.pesos) - self.pesos / 2
+        x = np.concatenate([[self.minimo], self.medias, [self.maximo]])
+        y = np.concatenate([[0.0], posiciones, [total]])
+        return x, y, total
+
+    def cuantil(self, q):
+        """Cuantil(es) aproximado(s) para ``q`` en [0, 1]."""
+        x, y, total = self._puntos()
+        if total == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        if self.exacto:
+            # Interpolación lineal, como Series.quantile
+            return np.quantile(self.medias, q)
+        return np.interp(np.asarray(q) * total, y, x)
+
+    def cdf(self, valores):
+        """Fracción aproximada de datos <= ``valores``."""
+        x, y, total = self._puntos()
+        if total == 0:
+            return np.full(np.shape(valores), np.nan)
+        if self.exacto:
+            return np.searchsorted(self.medias, valores, side='right') / total
+        return np.interp(valores, x, y) / total
+
+    def fuera_de(self, inferior, superior):
+        """Número aproximado de datos < ``inferior`` o > ``superior``."""
+        self._comprimir()
+        if self.exacto:
+            return int(np.searchsorted(self.medias, inferior, side='left')
+                       + len(self.medias) - np.searchsorted(self.medias, superior, side='right'))
+        cdf_inf, cdf_sup = self.cdf([inferior, superior])
+        return int(round(self.n * (cdf_inf + 1 - cdf_sup)))
+
+
+# --- 3. PERFIL (MOMENTOS + SKETCHES) ---
+
+class Perfil:
+    """Estadísticas suficientes de un conjunto de columnas, por bloques y combinables."""
+
+    def __init__(self, columnas, compresion=200):
+        self.columnas = list(columnas)
+        self.momentos = Momentos(len(self.columnas))
+        self.sketches = {c: TDigest(compresion) for c in self.columnas}
+
+    def actualizar(self, df):
+        X = df[self.columnas].to_numpy(dtype=np.float64)
+        self.momentos.actualizar(X)
+        for j, col in enumerate(self.columnas):
+            self.sketches[col].actualizar(X[:, j])
+        return self
+
+    def combinar(self, otro):
+        self.momentos.combinar(otro.momentos)
+        for col in self.columnas:
+            self.sketches[col].combinar(otro.sketches[col])
+        return self
+
+    def correlacion(self):
+        """
+        Matriz de correlación de Pearson.
+
+        Las filas con algún NaN en las columnas del perfil se descartan enteras
+        (eliminación por lista), mientras que ``df[columnas].corr()`` descarta por
+        pares: sin faltantes el resultado es el mismo. Por eso las columnas de
+        audio y las de popularidad van en perfiles distintos: un ``streams``
+        faltante no debe sacar a la canción de la correlación de audio.
+        """
+        return pd.DataFrame(self.momentos.correlacion(),
+                            index=self.columnas, columns=self.columnas)
+
+    def reporte_outliers(self, columnas=None, k=1.5, minimo_cero=False):
+        """
+        Límites IQR y número aproximado de outliers por columna.
+
+        Equivale a ``outliers_iqr`` del notebook de regresión; con
+        ``minimo_cero=True`` el límite inferior se recorta a 0 como en su
+        segunda versión (variables transformadas).
+        """
+        filas = []
+        for col in columnas or self.columnas:
+            sketch = self.sketches[col]
+            if sketch.n == 0:
+                # Columna sin valores (todo NaN)
+                filas.append({'columna': col, 'Q1': np.nan, 'Q3': np.nan, 'limite_inferior': np.nan,
+                              'limite_superior': np.nan, 'outliers_aprox': 0})
+                continue
+            q1, q3 = sketch.cuantil([0.25, 0.75])
+            iqr = q3 - q1
+            inferior = q1 - k * iqr
+            if minimo_cero:
+                inferior = max(0, inferior)
+            superior = q3 + k * iqr
+            filas.append({'columna': col, 'Q1': q1, 'Q3': q3,
+                          'limite_inferior': inferior, 'limite_superior': superior,
+                          'outliers_aprox': sketch.fuera_de(inferior, superior)})
+        return pd.DataFrame(filas).set_index('columna')
+
+
+def rangos_aproximados(perfil, df):
+    """Rango relativo (CDF del sketch) de cada valor; base para la correlación de Spearman."""
+    return pd.DataFrame({c: perfil.sketches[c].cdf(df[c].to_numpy(dtype=np.float64))
+                         for c in perfil.columnas}, index=df.index)
+
+
+def perfilar_dataframe(df, columnas=AUDIO_FEATURES, compresion=200):
+    """Perfil de un DataFrame ya en memoria."""
+    columnas = [c for c in columnas if c in df.columns]
+    return Perfil(columnas, compresion).actualizar(df)
+
+
+# --- 4. PROCESAMIENTO POR BLOQUES Y EN PARALELO ---
+
+def _perfiles_de_bloque(df, grupos, compresion):
+    df = limpiar_numericas(df)
+    return [Perfil(columnas, compresion).actualizar(df) for columnas in grupos]
+
+
+def perfilar_csv(ruta, grupos, tamano_chunk=100_000, procesos=None, compresion=200):
+    """
+    Perfila un CSV por bloques sin cargarlo entero.
+
+    ``grupos`` es una lista de listas de columnas; se devuelve un ``Perfil`` por
+    grupo, todos en una sola lectura del archivo (ver ``Perfil.correlacion``
+    sobre por qué conviene separar grupos).
+
+    Con ``procesos`` > 1 cada bloque se procesa en un worker y los perfiles
+    parciales se combinan a medida que terminan (como mucho ``2 * procesos``
+    bloques en vuelo, para acotar la memoria).
+    """
+    bloques = pd.read_csv(ruta, chunksize=tamano_chunk)
+    totales = [Perfil(columnas, compresion) for columnas in grupos]
+
+    def combinar(parciales):
+        for total, parcial in zip(totales, parciales):
+            total.combinar(parcial)
+
+    if not procesos or procesos <= 1:
+        for bloque in bloques:
+            combinar(_perfiles_de_bloque(bloque, grupos, compresion))
+        return totales
+
+    with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+        pendientes = set()
+        for bloque in bloques:
+            pendientes.add(ejecutor.submit(_perfiles_de_bloque, bloque, grupos, compresion))
+            if len(pendientes) >= 2 * procesos:
+                hechos, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+                for futuro in hechos:
+                    combinar(futuro.result())
+        for futuro in pendientes:
+            combinar(futuro.result())
+    return totales
+
+
+def spearman_csv(ruta, perfil, tamano_chunk=100_000):
+    """
+    Correlación de rangos aproximada (Spearman) en una segunda pasada.
+
+    Usa los sketches de ``perfil`` (primera pasada) para convertir cada valor en
+    su rango relativo y acumula la correlación de Pearson de esos rangos.
+    """
+    momentos = Momentos(len(perfil.columnas))
+    for bloque in pd.read_csv(ruta, chunksize=tamano_chunk):
+        momentos.actualizar(rangos_aproximados(perfil, limpiar_numericas(bloque)).to_numpy())
+    return pd.DataFrame(momentos.correlacion(), index=perfil.columnas, columns=perfil.columnas)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Perfil en streaming de un CSV de canciones.")
+    parser.add_argument('ruta')
+    parser.add_argument('--chunk', type=int, default=100_000)
+    parser.add_argument('--procesos', type=int, default=None)
+    parser.add_argument('--spearman', action='store_true')
+    args = parser.parse_args()
+
+    cabecera = pd.read_csv(args.ruta, nrows=0).columns.str.strip()
+    # Perfiles separados: los faltantes de popularidad no afectan a la correlación de audio
+    grupos = [[c for c in AUDIO_FEATURES if c in cabecera], [c for c in COLS_OUTLIERS if c in cabecera]]
+    perfil_audio, perfil_popularidad = perfilar_csv(args.ruta, grupos, args.chunk, args.procesos)
+
+    with pd.option_context('display.width', 160, 'display.max_columns', None):
+        print(f"Filas completas (audio): {perfil_audio.momentos.n}\n\n== Correlación (Pearson) ==")
+        print(perfil_audio.correlacion().round(2))
+        if args.spearman:
+            print("\n== Correlación de rangos (Spearman aprox.) ==")
+            print(spearman_csv(args.ruta, perfil_audio, args.chunk).round(2))
+        print("\n== Outliers (IQR) ==")
+        print(pd.concat([perfil_audio.reporte_outliers(), perfil_popularidad.reporte_outliers()]).round(1))
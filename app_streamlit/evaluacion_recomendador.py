@@ -0,0 +1,253 @@
+"""
+Evaluación offline de variantes del recomendador.
+
+En ``songs_recomendation_system_knn.ipynb`` los espacios KNN se comparan
+mirando canciones sueltas (``distances_df1[100]``,
+``evaluar_coherencia_recomendaciones``). Este módulo construye cada variante,
+calcula métricas sobre todo el catálogo en un pool de procesos y escribe un
+reporte comparativo:
+
+* ``coherencia_audio``: diferencia absoluta media (características en [0, 1])
+  entre la canción y el promedio de sus vecinas; menor es mejor.
+* ``acuerdo_genero``: fracción de vecinas con el mismo ``genre_inferred``.
+* ``diversidad_artistas``: fracción de vecinas sin ningún artista en común.
+* ``duplicados``: fracción de vecinas que son otra versión de la misma canción.
+* ``cobertura``: fracción del catálogo que aparece en alguna lista de vecinas.
+* ``latencia_p50_ms`` / ``latencia_p95_ms``: consulta individual de k vecinos.
+  Se mide en serie en el proceso principal, al terminar el pool y con BLAS
+  limitado a un hilo, para que las variantes no compitan por la CPU.
+* Jaccard medio de las listas de vecinas entre cada par de variantes.
+
+Uso desde terminal:
+
+    python evaluacion_recomendador.py [ruta_csv] [--k 5] [--procesos 4] [--salida reporte]
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.decomposition import PCA
+from sklearn.neighbors import NearestNeighbors
+from sklearn.preprocessing import StandardScaler
+from threadpoolctl import threadpool_limits
+
+from catalogo import (COLS_RECS, RUTA_CSV, cargar_catalogo,
+                      codificar_artistas, matriz_audio)
+from duplicados import COLS_DUPLICADOS, detectar_duplicados
+from mapa_embedding import matriz_recomendacion
+
+# Variante -> algoritmo de NearestNeighbors (como en el notebook)
+VARIANTES = {
+    'con_artistas': 'ball_tree',
+    'sin_artistas': 'brute',
+    'estandar_pca': 'brute',
+}
+VARIANTE_PRODUCCION = 'produccion'
+
+N_CONSULTAS_LATENCIA = 200
+
+
+# --- 1. ESPACIOS ---
+
+def _matriz_artistas(df):
+    _, pares = codificar_artistas(df)
+    artistas = np.zeros((len(df), pares['id_artista'].max() + 1), dtype=np.float32)
+    artistas[pares['fila'], pares['id_artista']] = 1
+    return artistas
+
+
+def construir_espacio(df, variante):
+    """Matriz de características de ``variante`` (filas en el orden de ``df``)."""
+    if variante == 'sin_artistas':
+        return matriz_recomendacion(df)
+    if variante == 'con_artistas':
+        return np.hstack([matriz_recomendacion(df), _matriz_artistas(df)])
+    if variante == 'estandar_pca':
+        X_std = StandardScaler().fit_transform(matriz_audio(df))
+        return PCA(n_components=6, random_state=42).fit_transform(X_std)
+    raise ValueError(f"Variante desconocida: {variante}")
+
+
+def vecinos_produccion(df, k):
+    """Posiciones de las recomendaciones precalculadas (``id_rec_*``) del CSV."""
+    posicion = pd.Series(np.arange(len(df)), index=df['id_song'].to_numpy())
+    ids = df[COLS_RECS[:k]].to_numpy()
+    return posicion.reindex(ids.ravel()).fillna(-1).to_numpy(dtype=np.int64).reshape(ids.shape)
+
+
+# --- 2. MÉTRICAS ---
+
+def metricas_vecinos(df, indices):
+    """Métricas de calidad de una matriz (n x k) de posiciones de vecinas (-1 = faltante)."""
+    validos = indices >= 0
+    seguros = np.where(validos, indices, 0)
+
+    # Coherencia por característica, ignorando los valores de audio NaN (de la
+    # canción o de la vecina) en lugar de propagarlos a toda la variante
+    audio = matriz_audio(df, escalar=True)
+    finito = ~np.isnan(audio)
+    audio = np.nan_to_num(audio)
+    peso = validos[..., None] & finito[seguros]
+    n_vecinas = peso.sum(axis=1)
+    media_vecinas = (audio[seguros] * peso).sum(axis=1) / np.maximum(n_vecinas, 1)
+    comparables = finito & (n_vecinas > 0)
+    diferencia = (np.abs(audio - media_vecinas) * comparables).sum(axis=1) / np.maximum(comparables.sum(axis=1), 1)
+
+    genero = df['genre_inferred'].astype(str).to_numpy()
+    cluster = df['cluster_duplicado'].to_numpy()
+
+    _, pares = codificar_artistas(df)
+    artistas = [set() for _ in range(len(df))]
+    for fila, id_artista in zip(pares['fila'], pares['id_artista']):
+        artistas[fila].add(id_artista)
+    sin_artista_comun = np.array([[not (artistas[i] & artistas[j]) for j in fila]
+                                  for i, fila in enumerate(seguros)])
+
+    def media(matriz):
+        return float(matriz[validos].mean()) if validos.any() else np.nan
+
+    return {
+        'coherencia_audio': float(diferencia[comparables.any(axis=1)].mean()),
+        'acuerdo_genero': media(genero[seguros] == genero[:, None]),
+        'diversidad_artistas': media(sin_artista_comun),
+        'duplicados': media(cluster[seguros] == cluster[:, None]),
+        'cobertura': float(len(np.unique(indices[validos])) / len(df)),
+    }
+
+
+def jaccard_medio(a, b):
+    """Jaccard medio, canción a canción, entre dos matrices de vecinas."""
+    valores = []
+    for fila_a, fila_b in zip(a, b):
+        sa, sb = set(fila_a[fila_a >= 0]), set(fila_b[fila_b >= 0])
+        if sa or sb:
+            valores.append(len(sa & sb) / len(sa | sb))
+    return float(np.mean(valores)) if valores else np.nan
+
+
+# --- 3. EVALUACIÓN EN PARALELO ---
+
+def _ajustar(X, variante, k):
+    return NearestNeighbors(n_neighbors=k + 1, algorithm=VARIANTES[variante]).fit(X)
+
+
+def quitar_propia(indices, k):
+    """
+    Quita a cada canción de su propia lista y se queda con las ``k`` primeras.
+
+    Con filas idénticas un empate puede dejar a la gemela antes que la propia
+    canción, así que se filtra por posición en lugar de descartar la primera.
+    """
+    propia = indices == np.arange(len(indices))[:, None]
+    orden = np.argsort(propia, axis=1, kind='stable')
+    return np.take_along_axis(indices, orden, axis=1)[:, :k]
+
+
+def evaluar_variante(df, variante, k=5):
+    """Construye la variante, obtiene las k vecinas de cada canción y mide. Devuelve (métricas, índices)."""
+    if variante == VARIANTE_PRODUCCION:
+        indices = vecinos_produccion(df, k)
+        return metricas_vecinos(df, indices), indices
+
+    X = construir_espacio(df, variante)
+    indices = quitar_propia(_ajustar(X, variante, k).kneighbors(X, return_distance=False), k)
+    resultado = metricas_vecinos(df, indices)
+    resultado['dimensiones'] = X.shape[1]
+    return resultado, indices
+
+
+def medir_latencia(df, variante, k=5, semilla=42, n_consultas=N_CONSULTAS_LATENCIA):
+    """
+    Tiempo de ajuste y percentiles de la consulta individual de ``k`` vecinos.
+
+    Pensada para ejecutarse en serie y sin otros procesos compitiendo; las
+    consultas son siempre las mismas canciones (``semilla``).
+    """
+    X = construir_espacio(df, variante)
+    t0 = time.perf_counter()
+    modelo = _ajustar(X, variante, k)
+    t_ajuste = time.perf_counter() - t0
+
+    consultas = np.random.default_rng(semilla).choice(len(X), size=min(n_consultas, len(X)), replace=False)
+    for i in consultas[:10]:
+        # Calentamiento (cachés, primera llamada de sklearn)
+        modelo.kneighbors(X[i:i + 1])
+    tiempos = []
+    for i in consultas:
+        t0 = time.perf_counter()
+        modelo.kneighbors(X[i:i + 1])
+        tiempos.append(1000 * (time.perf_counter() - t0))
+
+    return {'ajuste_s': t_ajuste,
+            'latencia_p50_ms': float(np.percentile(tiempos, 50)),
+            'latencia_p95_ms': float(np.percentile(tiempos, 95))}
+
+
+def _evaluar_en_worker(ruta, variante, k):
+    return evaluar_variante(_cargar(ruta), variante, k)
+
+
+def _cargar(ruta):
+    df = cargar_catalogo(ruta)
+    if not set(COLS_DUPLICADOS).issubset(df.columns):
+        df = detectar_duplicados(df)
+    return df
+
+
+def comparar_variantes(ruta=RUTA_CSV, variantes=None, k=5, procesos=None):
+    """
+    Evalúa cada variante en un proceso distinto y mide la latencia en serie.
+
+    Devuelve ``(metricas, jaccard)``: una fila por variante y la matriz de
+    Jaccard medio entre las listas de vecinas de cada par de variantes.
+    """
+    variantes = list(variantes or [*VARIANTES, VARIANTE_PRODUCCION])
+    with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+        futuros = {v: ejecutor.submit(_evaluar_en_worker, ruta, v, k) for v in variantes}
+        resultados = {v: f.result() for v, f in futuros.items()}
+
+    # Latencia: una variante detrás de otra, ya sin el pool y con BLAS a un hilo
+    df = cargar_catalogo(ruta)
+    with threadpool_limits(limits=1):
+        for v in variantes:
+            if v != VARIANTE_PRODUCCION:
+                resultados[v][0].update(medir_latencia(df, v, k))
+
+    metricas = pd.DataFrame({v: r[0] for v, r in resultados.items()}).T
+    jaccard = pd.DataFrame(index=variantes, columns=variantes, dtype=float)
+    for a in variantes:
+        for b in variantes:
+            jaccard.loc[a, b] = jaccard_medio(resultados[a][1], resultados[b][1])
+    return metricas, jaccard
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparación offline de variantes del recomendador.")
+    parser.add_argument('ruta', nargs='?', default=RUTA_CSV)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--procesos', type=int, default=None)
+    parser.add_argument('--variantes', nargs='+', default=None,
+                        choices=[*VARIANTES, VARIANTE_PRODUCCION])
+    parser.add_argument('--salida', default='reporte_recomendador',
+                        help="Carpeta donde se escriben metricas.csv y jaccard.csv")
+    args = parser.parse_args()
+
+    metricas, jaccard = comparar_variantes(args.ruta, args.variantes, args.k, args.procesos)
+
+    os.makedirs(args.salida, exist_ok=True)
+    metricas.to_csv(os.path.join(args.salida, 'metricas.csv'))
+    jaccard.to_csv(os.path.join(args.salida, 'jaccard.csv'))
+
+    with pd.option_context('display.width', 160, 'display.max_columns', None):
+        print(f"== Métricas (k={args.k}) ==")
+        print(metricas.round(3))
+        print("\n== Jaccard medio entre variantes ==")
+        print(jaccard.round(3))
+    print(f"\nReporte escrito en {args.salida}/")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Mapa 2-D del espacio de recomendación.
+
+``grafica_similares_dos_caracteristicas_df_completo`` solo puede enfrentar dos
+características crudas y redibuja todo el dataset en cada rerun. Aquí se
+proyecta el espacio completo del recomendador (características de audio
+escaladas + tonalidad y modo en one-hot, como ``X_sin_artistas`` en
+``songs_recomendation_system_knn.ipynb``) a 2 dimensiones una sola vez por
+versión del catálogo:
+
+* ``'pca'``: PCA exacta (SVD de la matriz centrada).
+* ``'svd_aleatorio'``: SVD aleatorizada (Halko et al.), para catálogos grandes.
+* ``'auto'`` (por defecto): ``'svd_aleatorio'`` a partir de
+  ``UMBRAL_SVD_ALEATORIO`` canciones y ``'pca'`` por debajo.
+
+Las coordenadas se guardan como columnas ``mapa_x``/``mapa_y`` (y en el bundle
+de ``catalogo.py``) y el fondo se dibuja a partir de un histograma 2-D
+precalculado, así que el coste de la gráfica no depende del tamaño del catálogo.
+"""
+import numpy as np
+import pandas as pd
+
+from catalogo import AUDIO_FEATURES, matriz_audio
+
+COLS_MAPA = ['mapa_x', 'mapa_y']
+METODOS = ('auto', 'pca', 'svd_aleatorio')
+UMBRAL_SVD_ALEATORIO = 100_000
+
+
+# --- 1. ESPACIO Y PROYECCIÓN ---
+
+def matriz_recomendacion(df, features=AUDIO_FEATURES):
+    """Características de audio en [0, 1] + one-hot de tonalidad y modo (float32)."""
+    audio = matriz_audio(df, features, escalar=True)
+    dummies = pd.get_dummies(df[[c for c in ('et_key', 'et_mode') if c in df.columns]].astype('category'))
+    return np.hstack([np.nan_to_num(audio), dummies.to_numpy(dtype=np.float32)])
+
+
+def _svd_aleatorio(X, k, n_sobremuestreo=10, n_iter=4, semilla=0):
+    """Primeros ``k`` vectores singulares derechos por SVD aleatorizada."""
+    rng = np.random.default_rng(semilla)
+    Q = X @ rng.standard_normal((X.shape[1], k + n_sobremuestreo)).astype(X.dtype)
+    for _ in range(n_iter):
+        Q, _ = np.linalg.qr(X @ (X.T @ Q))
+    Q, _ = np.linalg.qr(Q)
+    _, _, Vt = np.linalg.svd(Q.T @ X, full_matrices=False)
+    return Vt[:k]
+
+
+def proyectar(X, metodo='auto'):
+    """Coordenadas 2-D (float32) de las filas de ``X``."""
+    if metodo == 'auto':
+        metodo = 'svd_aleatorio' if len(X) >= UMBRAL_SVD_ALEATORIO else 'pca'
+    centrada = X - X.mean(axis=0)
+    if metodo == 'pca':
+        _, _, Vt = np.linalg.svd(centrada, full_matrices=False)
+        componentes = Vt[:2]
+    elif metodo == 'svd_aleatorio':
+        componentes = _svd_aleatorio(centrada, 2)
+    else:
+        raise ValueError(f"Método de proyección desconocido: {metodo}")
+
+    # Signo determinista: la mayor carga de cada componente es positiva
+    signos = np.sign(componentes[np.arange(2), np.abs(componentes).argmax(axis=1)])
+    return (centrada @ (componentes * signos[:, None]).T).astype(np.float32)
+
+
+def agregar_coordenadas(df, metodo='auto'):
+    """Copia de ``df`` con las columnas ``mapa_x`` y ``mapa_y``."""
+    df = df.copy()
+    df[COLS_MAPA] = proyectar(matriz_recomendacion(df), metodo)
+    return df
+
+
+# --- 2. FONDO DE DENSIDAD ---
+
+def densidad_mapa(df, bins=80):
+    """
+    Histograma 2-D de las coordenadas: ``(conteos, bordes_x, bordes_y)``.
+
+    Se calcula una vez y se pinta como imagen, en lugar de un scatter con
+    todos los puntos del catálogo.
+    """
+    conteos, bordes_x, bordes_y = np.histogram2d(df['mapa_x'], df['mapa_y'], bins=bins)
+    return conteos.astype(np.float32), bordes_x, bordes_y
+
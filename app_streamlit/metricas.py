@@ -0,0 +1,270 @@
+"""
+Instrumentación ligera de los reruns de las páginas.
+
+Se activa con variables de entorno; si ``SPOTIFY_METRICAS`` no está definida,
+``tramo`` devuelve un contexto vacío compartido, ``cronometrado`` devuelve la
+función sin tocar y ``cache_instrumentado`` equivale a ``st.cache_data``, así
+que el coste con las métricas apagadas es prácticamente nulo.
+
+Variables de entorno:
+
+* ``SPOTIFY_METRICAS=1``: activa la instrumentación.
+* ``SPOTIFY_METRICAS_DIR``: directorio donde cada proceso vuelca su agregado
+  en JSON al final de cada rerun, en ``<pid>.json`` (por defecto
+  ``metricas_app/``). Con varios workers por host hay un archivo por worker y
+  el total del host es la suma.
+* ``SPOTIFY_METRICAS_PUERTO``: si se define, el worker que consigue el
+  puerto (los demás lo reintentan cada ``REINTENTO_PUERTO_S`` segundos, por si
+  el que lo tiene muere) expone en ``http://localhost:<puerto>/metrics`` (formato de texto de
+  Prometheus) los agregados de todos los archivos del directorio, cada serie
+  con la etiqueta ``proceso="<pid>"`` para poder sumarlas con ``sum by``.
+
+Uso en una página:
+
+    with tramo('artistas.filtro'):
+        df_artista = ...
+"""
+import contextlib
+import functools
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+ACTIVADO = os.environ.get('SPOTIFY_METRICAS', '').lower() not in ('', '0', 'false', 'no')
+DIRECTORIO = os.environ.get('SPOTIFY_METRICAS_DIR', 'metricas_app')
+PUERTO = os.environ.get('SPOTIFY_METRICAS_PUERTO')
+
+# Límites superiores (segundos) de los buckets del histograma, estilo Prometheus
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_histogramas = {}   # nombre -> {'buckets': [...], 'suma': float, 'total': int}
+_cache = {}         # nombre -> {'llamadas': int, 'misses': int}
+_nulo = contextlib.nullcontext()
+REINTENTO_PUERTO_S = 30.0
+
+_servidor = None
+_proximo_intento = 0.0
+_avisado = False
+_log = logging.getLogger(__name__)
+
+
+# --- 1. REGISTRO ---
+
+def observar(nombre, segundos):
+    """Añade una duración al histograma ``nombre``."""
+    with _lock:
+        h = _histogramas.get(nombre)
+        if h is None:
+            h = _histogramas[nombre] = {'buckets': [0] * len(BUCKETS), 'suma': 0.0, 'total': 0}
+        for i, limite in enumerate(BUCKETS):
+            if segundos <= limite:
+                h['buckets'][i] += 1
+        h['suma'] += segundos
+        h['total'] += 1
+
+
+@contextlib.contextmanager
+def _tramo_activo(nombre):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observar(nombre, time.perf_counter() - t0)
+
+
+def tramo(nombre):
+    """Context manager que mide el bloque y lo registra como ``nombre``."""
+    if not ACTIVADO:
+        return _nulo
+    return _tramo_activo(nombre)
+
+
+def cronometrado(nombre):
+    """Decorador equivalente a envolver la función entera en ``tramo(nombre)``."""
+    def decorador(func):
+        if not ACTIVADO:
+            return func
+
+        @functools.wraps(func)
+        def envoltura(*args, **kwargs):
+            with _tramo_activo(nombre):
+                return func(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def _contar_cache(nombre, campo):
+    with _lock:
+        c = _cache.setdefault(nombre, {'llamadas': 0, 'misses': 0})
+        c[campo] += 1
+
+
+def cache_instrumentado(nombre, **kwargs_cache):
+    """
+    ``st.cache_data`` con contadores de aciertos/fallos.
+
+    Cada llamada cuenta como ``llamada``; cada vez que el cuerpo de la función
+    se ejecuta de verdad cuenta como ``miss``. Los aciertos son la diferencia.
+    """
+    import streamlit as st
+
+    def decorador(func):
+        if not ACTIVADO:
+            return st.cache_data(**kwargs_cache)(func)
+
+        @functools.wraps(func)
+        def cuerpo(*args, **kwargs):
+            _contar_cache(nombre, 'misses')
+            return func(*args, **kwargs)
+
+        cacheada = st.cache_data(**kwargs_cache)(cuerpo)
+
+        @functools.wraps(func)
+        def envoltura(*args, **kwargs):
+            _contar_cache(nombre, 'llamadas')
+            with _tramo_activo(nombre):
+                return cacheada(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+# --- 2. EXPORTACIÓN ---
+
+def resumen():
+    """Copia del agregado actual (histogramas y contadores de caché)."""
+    with _lock:
+        histogramas = {
+            nombre: {'buckets': dict(zip(map(str, BUCKETS), h['buckets'])),
+                     'suma_s': h['suma'], 'total': h['total'],
+                     'media_ms': 1000 * h['suma'] / h['total'] if h['total'] else 0.0}
+            for nombre, h in _histogramas.items()
+        }
+        cache = {nombre: {**c, 'hits': c['llamadas'] - c['misses']}
+                 for nombre, c in _cache.items()}
+    return {'pid': os.getpid(), 'histogramas': histogramas, 'cache': cache}
+
+
+def resumenes():
+    """
+    Agregados de todos los workers del host, por pid.
+
+    Lee los ``<pid>.json`` de ``DIRECTORIO`` y usa el agregado en vivo para el
+    proceso actual. Los archivos de workers que ya no existen se borran (sus
+    series dejan de exportarse) y los ilegibles se ignoran.
+    """
+    datos = {}
+    for archivo in glob.glob(os.path.join(DIRECTORIO, '*.json')):
+        try:
+            with open(archivo) as f:
+                d = json.load(f)
+            pid = d['pid']
+            if not _proceso_vivo(pid):
+                os.remove(archivo)
+                continue
+            datos[pid] = d
+        except (OSError, ValueError, KeyError, TypeError):
+            continue
+    datos[os.getpid()] = resumen()
+    return datos
+
+
+def _proceso_vivo(pid):
+    """Si existe un proceso con ``pid`` (solo POSIX; en otros sistemas se asume que sí)."""
+    if pid == os.getpid():
+        return True
+    if os.name != 'posix':
+        # En Windows os.kill(pid, 0) termina el proceso en lugar de comprobarlo
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Existe, pero es de otro usuario
+        return True
+    return True
+
+
+def texto_prometheus():
+    """Los agregados de todos los workers en formato de texto de Prometheus."""
+    datos = sorted(resumenes().items())
+    lineas = ['# TYPE spotify_app_tramo_segundos histogram']
+    for pid, d in datos:
+        for nombre, h in sorted(d['histogramas'].items()):
+            etiquetas = f'proceso="{pid}",tramo="{nombre}"'
+            for limite, n in h['buckets'].items():
+                lineas.append(f'spotify_app_tramo_segundos_bucket{{{etiquetas},le="{limite}"}} {n}')
+            lineas.append(f'spotify_app_tramo_segundos_bucket{{{etiquetas},le="+Inf"}} {h["total"]}')
+            lineas.append(f'spotify_app_tramo_segundos_sum{{{etiquetas}}} {h["suma_s"]}')
+            lineas.append(f'spotify_app_tramo_segundos_count{{{etiquetas}}} {h["total"]}')
+
+    lineas.append('# TYPE spotify_app_cache_total counter')
+    for pid, d in datos:
+        for nombre, c in sorted(d['cache'].items()):
+            for resultado in ('hits', 'misses'):
+                lineas.append(f'spotify_app_cache_total{{proceso="{pid}",funcion="{nombre}",'
+                              f'resultado="{resultado}"}} {c[resultado]}')
+    return '\n'.join(lineas) + '\n'
+
+
+def _iniciar_servidor(puerto):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            cuerpo = texto_prometheus().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(('127.0.0.1', int(puerto)), _Manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def volcar():
+    """
+    Cierra el rerun: escribe el agregado del proceso en ``DIRECTORIO/<pid>.json``
+    y, si se configuró un puerto y este proceso no lo tiene, intenta levantar
+    el endpoint de Prometheus (como mucho cada ``REINTENTO_PUERTO_S``).
+    """
+    global _servidor, _proximo_intento, _avisado
+    if not ACTIVADO:
+        return
+
+    with _lock:
+        if PUERTO and _servidor is None and time.monotonic() >= _proximo_intento:
+            try:
+                _servidor = _iniciar_servidor(PUERTO)
+                if _avisado:
+                    _log.warning("Métricas: el proceso %d expone ahora el puerto %s", os.getpid(), PUERTO)
+            except OSError as error:
+                # Normalmente otro worker ya tiene el puerto y exporta también
+                # nuestro archivo; seguimos con el JSON y se reintenta más tarde
+                _proximo_intento = time.monotonic() + REINTENTO_PUERTO_S
+                if not _avisado:
+                    _log.warning("Métricas: no se pudo abrir el puerto %s en el proceso %d (%s); "
+                                 "se exporta %s y se reintentará cada %.0f s",
+                                 PUERTO, os.getpid(), error, _ruta_proceso(), REINTENTO_PUERTO_S)
+                    _avisado = True
+
+    # Escritura atómica para no dejar el archivo a medias si hay otro rerun
+    os.makedirs(DIRECTORIO, exist_ok=True)
+    destino = _ruta_proceso()
+    temporal = f'{destino}.{threading.get_ident()}.tmp'
+    with open(temporal, 'w') as f:
+        json.dump(resumen(), f, indent=2)
+    os.replace(temporal, destino)
+
+
+def _ruta_proceso():
+    return os.path.join(DIRECTORIO, f'{os.getpid()}.json')
@@ -1,23 +1,15 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
+from catalogo import cargar_catalogo, codificar_artistas, filas_de_artista
+from metricas import cache_instrumentado, tramo, volcar
 
 # --- Configuración de la página ---
 st.set_page_config(page_title="Explorador de Artistas", layout="wide", page_icon="🎤")
 
 # --- 1. CARGA DE DATOS ---
-@st.cache_data
+@cache_instrumentado('artistas.load_data')
 def load_data():
-    # Cargamos el mismo CSV actualizado
-    df = pd.read_csv('df_songs_all_con_genero_subgenero.csv')
-    df.columns = df.columns.str.strip()
-    
-    # Limpieza de streams (conversión a numérico)
-    if 'streams' in df.columns and df['streams'].dtype == 'object':
-        df['streams'] = df['streams'].astype(str).str.replace(',', '')
-        df['streams'] = pd.to_numeric(df['streams'], errors='coerce')
-        
-    return df
+    # Cargamos el mismo CSV actualizado con tipos compactos
+    return cargar_catalogo()
 
 try:
     df = load_data()
@@ -28,15 +20,12 @@ except Exception as e:
 # --- 2. LOGICA DE ARTISTAS ---
 # Extraemos una lista única de TODOS los artistas individuales
 # (Separando colaboraciones como "Drake, 21 Savage" en "Drake" y "21 Savage")
-@st.cache_data
+# y los codificamos como ids enteros para filtrar sin recorrer las cadenas
+@cache_instrumentado('artistas.obtener_lista_artistas')
 def obtener_lista_artistas(df):
-    # Separamos por coma y eliminamos espacios extra
-    todos_artistas = df['artist(s)_name'].str.split(',').explode().str.strip()
-    # Obtenemos únicos y ordenamos
-    lista = sorted(todos_artistas.unique())
-    return lista
+    return codificar_artistas(df)
 
-lista_artistas = obtener_lista_artistas(df)
+lista_artistas, pares_artistas = obtener_lista_artistas(df)
 
 # --- 3. SIDEBAR: BUSCADOR ---
 st.sidebar.header("🔍 Buscar Artista")
@@ -54,8 +43,9 @@ if artista_seleccionado:
     # FILTRADO INTELIGENTE:
     # Buscamos filas donde el artista seleccionado esté dentro de la lista de artistas de la canción
     # Esto asegura que si buscas "Drake", aparezca "Drake" y también "Drake, 21 Savage"
-    mask = df['artist(s)_name'].apply(lambda x: artista_seleccionado in [a.strip() for a in str(x).split(',')])
-    df_artista = df[mask]
+    with tramo('artistas.filtro'):
+        id_artista = lista_artistas.index(artista_seleccionado)
+        df_artista = df.iloc[filas_de_artista(pares_artistas, id_artista)]
 
     st.title(f"🎤 {artista_seleccionado}")
 
@@ -74,7 +64,8 @@ if artista_seleccionado:
     # B. Gráfica: Versatilidad de Géneros
     # Mostramos qué géneros toca este artista
     if 'genre_inferred' in df_artista.columns:
-        counts = df_artista['genre_inferred'].value_counts().reset_index()
+        # Las categóricas cuentan también los géneros sin canciones: los quitamos
+        counts = df_artista['genre_inferred'].value_counts().loc[lambda s: s > 0].reset_index()
         counts.columns = ['Género', 'Canciones']
         
         col_chart, col_empty = st.columns([1, 1]) # Usamos columnas para controlar el tamaño
@@ -82,9 +73,13 @@ if artista_seleccionado:
         with col_chart:
             st.subheader("🎹 Versatilidad Musical")
             if not counts.empty:
-                fig = px.pie(counts, names='Género', values='Canciones', hole=0.4, 
-                             title=f"Géneros de {artista_seleccionado}")
-                st.plotly_chart(fig, use_container_width=True)
+                # Importación diferida: plotly solo se carga al dibujar
+                import plotly.express as px
+
+                with tramo('artistas.grafica_generos'):
+                    fig = px.pie(counts, names='Género', values='Canciones', hole=0.4, 
+                                 title=f"Géneros de {artista_seleccionado}")
+                    st.plotly_chart(fig, use_container_width=True)
             else:
                 st.info("No hay datos suficientes de género.")
 
@@ -115,5 +110,8 @@ else:
     st.write("### Artistas populares en la base de datos:")
     
     # Mostrar un top 10 rápido de artistas con más canciones para inspirar
-    top_artistas = df['artist(s)_name'].str.split(',').explode().str.strip().value_counts().head(10)
-    st.bar_chart(top_artistas)
\ No newline at end of file
+    with tramo('artistas.top_artistas'):
+        top_artistas = df['artist(s)_name'].str.split(',').explode().str.strip().value_counts().head(10)
+        st.bar_chart(top_artistas)
+
+volcar()
@@ -1,21 +1,13 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
+from catalogo import cargar_catalogo
+from metricas import cache_instrumentado, tramo, volcar
 
 st.set_page_config(page_title="Explorador Géneros", layout="wide")
 
-@st.cache_data
+@cache_instrumentado('generos.load_data')
 def load_data():
-    # NOMBRE DE ARCHIVO ACTUALIZADO
-    df = pd.read_csv('df_songs_all_con_genero_subgenero.csv')
-    df.columns = df.columns.str.strip()
-    
-    # Limpieza numérica streams
-    if 'streams' in df.columns and df['streams'].dtype == 'object':
-        df['streams'] = df['streams'].astype(str).str.replace(',', '')
-        df['streams'] = pd.to_numeric(df['streams'], errors='coerce')
-        
-    return df
+    # NOMBRE DE ARCHIVO ACTUALIZADO (tipos compactos, ver catalogo.py)
+    return cargar_catalogo()
 
 try:
     df = load_data()
@@ -30,7 +22,8 @@ lista = sorted(df['genre_inferred'].dropna().unique())
 sel_gen = st.sidebar.radio("Género:", lista)
 
 # --- CONTENIDO ---
-df_g = df[df['genre_inferred'] == sel_gen]
+with tramo('generos.filtro'):
+    df_g = df[df['genre_inferred'] == sel_gen]
 
 st.title(f"🎼 {sel_gen}")
 
@@ -44,18 +37,26 @@ st.divider()
 # Gráfico Subgéneros
 if 'subgenre_inferred' in df_g.columns:
     # Contamos ignorando nulos
-    counts = df_g['subgenre_inferred'].dropna().value_counts().reset_index()
+    # (y sin los subgéneros de la categórica que no aparecen en este género)
+    counts = df_g['subgenre_inferred'].dropna().value_counts().loc[lambda s: s > 0].reset_index()
     counts.columns = ['Subgénero', 'Total']
     
     if not counts.empty:
+        # Importación diferida: plotly solo se carga al dibujar
+        import plotly.express as px
+
         st.subheader("Distribución de Subgéneros")
-        fig = px.pie(counts, names='Subgénero', values='Total', hole=0.4)
-        st.plotly_chart(fig, use_container_width=True)
+        with tramo('generos.grafica_subgeneros'):
+            fig = px.pie(counts, names='Subgénero', values='Total', hole=0.4)
+            st.plotly_chart(fig, use_container_width=True)
 
 st.subheader("Lista de Canciones")
 cols = ['track_name', 'artist(s)_name', 'subgenre_inferred', 'streams']
-st.dataframe(
-    df_g[cols].sort_values('streams', ascending=False),
-    use_container_width=True,
-    hide_index=True
-)
\ No newline at end of file
+with tramo('generos.tabla'):
+    st.dataframe(
+        df_g[cols].sort_values('streams', ascending=False),
+        use_container_width=True,
+        hide_index=True
+    )
+
+volcar()
@@ -1,47 +1,61 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+from catalogo import cargar_catalogo, etiqueta_busqueda
+from duplicados import COLS_DUPLICADOS, detectar_duplicados
+from mapa_embedding import COLS_MAPA, agregar_coordenadas, densidad_mapa
+from metricas import cache_instrumentado, cronometrado, tramo, volcar
 
 # Configuración de la página
 st.set_page_config(page_title="Spotify Recommender Pro", layout="wide")
-sns.set_style("whitegrid")
 
 # --- 1. CARGA DE DATOS ---
-@st.cache_data
+@cache_instrumentado('recomendacion.load_data')
 def load_data():
     # Asegúrate de que el nombre del archivo sea el correcto
-    df = pd.read_csv('df_songs_all_con_genero_subgenero.csv') 
-    
-    # Limpieza básica
-    df.columns = df.columns.str.strip()
-    df['search_label'] = df['track_name'] + " - " + df['artist(s)_name']
-    
-    cols_to_numeric = [
-        'id_song', 'id_rec_1', 'id_rec_2', 'id_rec_3', 'id_rec_4', 'id_rec_5', 
-        'bpm', 'danceability_%', 'valence_%', 'energy_%', 'acousticness_%', 
-        'instrumentalness_%', 'liveness_%', 'speechiness_%',
-        'streams', 'in_spotify_playlists', 'in_spotify_charts', 'in_apple_playlists',
-        'in_apple_charts', 'in_deezer_playlists', 'in_deezer_charts', 'in_shazam_charts'
-    ]
-    
-    for col in cols_to_numeric:
-        if col in df.columns:
-            if df[col].dtype == 'object':
-                df[col] = df[col].astype(str).str.replace(',', '')
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-            
+    # (limpieza básica y tipos compactos en catalogo.py; la etiqueta
+    # "Canción - Artista" ya no se guarda como columna, se genera al mostrarla)
+    df = cargar_catalogo()
+    # Coordenadas del mapa 2-D: vienen en el bundle; si no, se calculan aquí
+    if not set(COLS_MAPA).issubset(df.columns):
+        df = agregar_coordenadas(df)
+    # Versiones de la misma canción, para no recomendarlas (ver duplicados.py):
+    # también vienen en el bundle; si no, se calculan aquí
+    if not set(COLS_DUPLICADOS).issubset(df.columns):
+        df = detectar_duplicados(df)
     return df
 
+@cache_instrumentado('recomendacion.load_densidad')
+def load_densidad():
+    # Fondo del mapa pre-binned: se calcula una vez por catálogo
+    return densidad_mapa(load_data())
+
 try:
     df_completo = load_data()
 except FileNotFoundError:
     st.error("⚠️ No se encontró el archivo. Asegúrate de subir el CSV correcto.")
     st.stop()
 
-# --- 2. FUNCIONES DE VISUALIZACIÓN (SIN CAMBIOS) ---
+# --- 2. FUNCIONES DE VISUALIZACIÓN ---
+
+def obtener_vecinos(fila, df_completo):
+    # Recomendaciones precalculadas, sin otras versiones de la misma canción
+    # (ni de la original ni repetidas entre sí)
+    cols_recs = ['id_rec_1', 'id_rec_2', 'id_rec_3', 'id_rec_4', 'id_rec_5']
+    ids_vecinos = fila[cols_recs].dropna().values
+    vecinos_df = df_completo[df_completo['id_song'].isin(ids_vecinos)]
+    vecinos_df = vecinos_df[vecinos_df['cluster_duplicado'] != fila['cluster_duplicado']]
+    return vecinos_df.drop_duplicates('cluster_duplicado')
 
+def _pyplot():
+    # Importación diferida: matplotlib y seaborn solo se cargan cuando el
+    # usuario ya eligió una canción y hay algo que dibujar
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    sns.set_style("whitegrid")
+    return plt
+
+@cronometrado('recomendacion.coherencia')
 def evaluar_coherencia_visual(song_id, df_completo):
     features_to_check = ['bpm', 'energy_%', 'danceability_%', 'valence_%', 
                          'acousticness_%', "instrumentalness_%", "liveness_%", "speechiness_%"]
@@ -50,9 +64,7 @@ def evaluar_coherencia_visual(song_id, df_completo):
 
     original_stats = fila_original.iloc[0][features_to_check]
     nombre_cancion = fila_original.iloc[0]['track_name']
-    cols_recs = ['id_rec_1', 'id_rec_2', 'id_rec_3', 'id_rec_4', 'id_rec_5']
-    ids_vecinos = fila_original.iloc[0][cols_recs].dropna().values
-    vecinos_df = df_completo[df_completo['id_song'].isin(ids_vecinos)]
+    vecinos_df = obtener_vecinos(fila_original.iloc[0], df_completo)
     reco_stats = vecinos_df[features_to_check]
     
     reco_mean = reco_stats.mean()
@@ -66,6 +78,7 @@ def evaluar_coherencia_visual(song_id, df_completo):
         'Máximo Recs': reco_stats.max()
     })
 
+    plt = _pyplot()
     indices_x = np.arange(len(features_to_check))
     width = 0.35
     fig = plt.figure(figsize=(14, 5))
@@ -79,6 +92,7 @@ def evaluar_coherencia_visual(song_id, df_completo):
     plt.tight_layout()
     return comparativa, fig
 
+@cronometrado('recomendacion.mapa_similitud')
 def grafica_similares_dos_caracteristicas_df_completo(idx_song, caracteristicas, df_completo):
     fila_original = df_completo[df_completo['id_song'] == idx_song]
     if fila_original.empty: return None
@@ -87,10 +101,9 @@ def grafica_similares_dos_caracteristicas_df_completo(idx_song, caracteristicas,
     x_origin = fila_original.iloc[0][x_col]
     y_origin = fila_original.iloc[0][y_col]
     nombre_origin = fila_original.iloc[0]['track_name']
-    cols_recs = ['id_rec_1', 'id_rec_2', 'id_rec_3', 'id_rec_4', 'id_rec_5']
-    ids_vecinos = fila_original.iloc[0][cols_recs].dropna().values
-    vecinos_df = df_completo[df_completo['id_song'].isin(ids_vecinos)]
+    vecinos_df = obtener_vecinos(fila_original.iloc[0], df_completo)
 
+    plt = _pyplot()
     fig = plt.figure(figsize=(10, 6)) 
     plt.scatter(df_completo[x_col], df_completo[y_col], c='lightgray', s=20, alpha=0.3, label='Resto del Dataset', zorder=0)
     for _, row in vecinos_df.iterrows():
@@ -108,19 +121,51 @@ def grafica_similares_dos_caracteristicas_df_completo(idx_song, caracteristicas,
     plt.tight_layout()
     return fig 
 
+@cronometrado('recomendacion.mapa_embedding')
+def grafica_mapa_embedding(idx_song, densidad, df_completo):
+    # Canción y vecinas sobre el fondo de densidad pre-binned del catálogo
+    # (coste constante: no se dibuja un punto por canción)
+    fila_original = df_completo[df_completo['id_song'] == idx_song]
+    if fila_original.empty: return None
+
+    fila = fila_original.iloc[0]
+    vecinos_df = obtener_vecinos(fila, df_completo)
+    conteos, bordes_x, bordes_y = densidad
+    x0, y0 = fila['mapa_x'], fila['mapa_y']
+
+    plt = _pyplot()
+    fig = plt.figure(figsize=(10, 6))
+    plt.imshow(np.log1p(conteos.T), origin='lower', cmap='Greys', aspect='auto', alpha=0.6,
+               extent=[bordes_x[0], bordes_x[-1], bordes_y[0], bordes_y[-1]], zorder=0)
+    for _, row in vecinos_df.iterrows():
+        plt.plot([x0, row['mapa_x']], [y0, row['mapa_y']], c='gray', linestyle='--', linewidth=1, alpha=0.6, zorder=1)
+    plt.scatter(vecinos_df['mapa_x'], vecinos_df['mapa_y'], c='dodgerblue', s=100, edgecolors='white', alpha=0.9, label='Recomendaciones', zorder=2)
+    plt.scatter(x0, y0, c='crimson', s=250, marker='*', edgecolors='black', label='Original', zorder=3)
+    plt.text(x0, y0, f"  {fila['track_name']}", fontsize=11, fontweight='bold', color='darkred', zorder=4, verticalalignment='bottom')
+    for _, row in vecinos_df.iterrows():
+        plt.text(row['mapa_x'], row['mapa_y'], f"  {row['track_name']}", fontsize=9, color='black', alpha=0.8, zorder=4)
+    plt.title('Mapa de Similitud: espacio completo del recomendador', fontsize=14)
+    plt.xlabel('Componente 1', fontsize=12)
+    plt.ylabel('Componente 2', fontsize=12)
+    plt.legend(loc='upper right')
+    plt.grid(False)
+    plt.tight_layout()
+    return fig
+
 # --- 3. INTERFAZ PRINCIPAL ---
 
 st.title("🎵 Dashboard de Recomendación Musical")
 
 opcion = st.selectbox(
     "Selecciona una canción:",
-    options=df_completo['search_label'].unique(),
+    options=df_completo.index,
+    format_func=lambda idx: etiqueta_busqueda(df_completo, idx),
     index=None,
     placeholder="Buscar..."
 )
 
-if opcion:
-    song_row = df_completo[df_completo['search_label'] == opcion].iloc[0]
+if opcion is not None:
+    song_row = df_completo.loc[opcion]
     id_seleccionado = song_row['id_song']
     
     # --- 1. INFO HEADER (Lógica Condicional para Subgénero) ---
@@ -152,8 +197,8 @@ if opcion:
     # --- 2. RECOMENDACIONES (Lógica Condicional en Texto) ---
     st.subheader(f"🎧 Si te gusta, escucha esto:")
     
-    rec_ids = [song_row[f'id_rec_{i}'] for i in range(1, 6)]
-    recs_df = df_completo[df_completo['id_song'].isin(rec_ids)]
+    with tramo('recomendacion.vecinos'):
+        recs_df = obtener_vecinos(song_row, df_completo)
     
     cols = st.columns(5)
     for idx, (i, row) in enumerate(recs_df.iterrows()):
@@ -196,15 +241,15 @@ if opcion:
 
     st.divider()
 
-    # --- ANÁLISIS DE COHERENCIA (SIN CAMBIOS) ---
+    # --- ANÁLISIS DE COHERENCIA ---
     st.subheader("📊 Análisis de Coherencia")
-    st.write("Comparamos las características de la canción original vs. el promedio de las 5 recomendaciones.")
+    st.write("Comparamos las características de la canción original vs. el promedio de sus recomendaciones.")
     
     df_tabla, fig_barras = evaluar_coherencia_visual(id_seleccionado, df_completo)
     
     if df_tabla is not None:
         tab1, tab2 = st.tabs(["📈 Gráfico Comparativo", "📋 Tabla de Datos"])
-        with tab1:
+        with tab1, tramo('recomendacion.render_coherencia'):
             st.pyplot(fig_barras)
         with tab2:
             st.dataframe(
@@ -214,22 +259,36 @@ if opcion:
 
     st.divider()
 
-    # --- MAPA DE SIMILITUD (SIN CAMBIOS) ---
+    # --- MAPA DE SIMILITUD ---
     st.subheader("🗺️ Mapa Visual de Similitud")
     st.write("Compara la canción seleccionada con sus recomendaciones en el mapa global.")
 
-    col_x, col_y = st.columns(2)
-    audio_features = ['bpm', 'danceability_%', 'valence_%', 'energy_%', 
-                      'acousticness_%', 'instrumentalness_%', 'liveness_%', 'speechiness_%']
-    
-    with col_x:
-        eje_x = st.selectbox("Eje X:", options=audio_features, index=6) 
-    with col_y:
-        eje_y = st.selectbox("Eje Y:", options=audio_features, index=3) 
+    modo_mapa = st.radio(
+        "Vista:",
+        ["Mapa del recomendador (2-D)", "Dos características"],
+        horizontal=True,
+        help="El mapa del recomendador proyecta todas las características usadas para recomendar; "
+             "'Dos características' enfrenta dos características de audio crudas."
+    )
+
+    if modo_mapa == "Mapa del recomendador (2-D)":
+        figura = grafica_mapa_embedding(id_seleccionado, load_densidad(), df_completo)
+    else:
+        col_x, col_y = st.columns(2)
+        audio_features = ['bpm', 'danceability_%', 'valence_%', 'energy_%', 
+                          'acousticness_%', 'instrumentalness_%', 'liveness_%', 'speechiness_%']
+        
+        with col_x:
+            eje_x = st.selectbox("Eje X:", options=audio_features, index=6) 
+        with col_y:
+            eje_y = st.selectbox("Eje Y:", options=audio_features, index=3) 
 
-    if eje_x and eje_y:
         figura = grafica_similares_dos_caracteristicas_df_completo(id_seleccionado, [eje_x, eje_y], df_completo)
-        if figura:
+
+    if figura:
+        with tramo('recomendacion.render_mapa_similitud'):
             st.pyplot(figura)
-        else:
-            st.warning("No se pudo generar la gráfica.")
\ No newline at end of file
+    else:
+        st.warning("No se pudo generar la gráfica.")
+
+volcar()
@@ -0,0 +1,88 @@
+"""
+Perfil de arranque de la app de Streamlit.
+
+Mide, cada cosa en un intérprete nuevo para que no influya la caché de módulos:
+
+* Tiempo de importación (acumulado) de cada módulo pesado, con ``-X importtime``.
+* Tiempo hasta el primer render de cada página, ejecutándola con ``AppTest``
+  (incluye importar streamlit, cargar datos y dibujar el estado inicial).
+
+Uso (desde la carpeta ``app_streamlit``):
+
+    python perfil_arranque.py
+"""
+import json
+import os
+import subprocess
+import sys
+
+DIRECTORIO_APP = os.path.dirname(os.path.abspath(__file__))
+
+MODULOS = ['streamlit', 'pandas', 'numpy', 'plotly.express', 'matplotlib.pyplot',
+           'seaborn', 'sklearn.neighbors', 'catalogo']
+
+PAGINAS = ['Home.py', 'pages/EDA.py', 'pages/Artistas.py', 'pages/Generos.py',
+           'pages/Sistema_Recomendacion.py']
+
+# Script que se ejecuta en el subproceso para medir una página
+_SCRIPT_RENDER = """
+import json, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+t_import = time.perf_counter() - t0
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+t1 = time.perf_counter()
+at.run()
+t_render = time.perf_counter() - t1
+print(json.dumps({'import_streamlit_s': t_import, 'primer_render_s': t_render,
+                  'excepciones': len(at.exception)}))
+"""
+
+
+def _ejecutar(args):
+    return subprocess.run([sys.executable, *args], cwd=DIRECTORIO_APP,
+                          capture_output=True, text=True)
+
+
+def tiempo_importacion(modulo):
+    """Tiempo acumulado (segundos) de importar ``modulo`` en un intérprete limpio."""
+    proc = _ejecutar(['-X', 'importtime', '-c', f'import {modulo}'])
+    if proc.returncode != 0:
+        return None
+
+    # Formato: "import time: self [us] | cumulative | imported package"
+    for linea in reversed(proc.stderr.splitlines()):
+        partes = [p.strip() for p in linea.split('|')]
+        if len(partes) == 3 and partes[2] == modulo:
+            return int(partes[1]) / 1e6
+    return None
+
+
+def tiempo_primer_render(pagina):
+    """Tiempos de la primera ejecución de ``pagina`` (dict) o ``None`` si falla."""
+    proc = _ejecutar(['-c', _SCRIPT_RENDER, pagina])
+    if proc.returncode != 0:
+        return None
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    print("== Importación por módulo (acumulado) ==")
+    for modulo in MODULOS:
+        t = tiempo_importacion(modulo)
+        texto = f"{t * 1000:8.1f} ms" if t is not None else "   no disponible"
+        print(f"{modulo:<22}{texto}")
+
+    print("\n== Tiempo hasta el primer render por página ==")
+    for pagina in PAGINAS:
+        r = tiempo_primer_render(pagina)
+        if r is None:
+            print(f"{pagina:<34}   error al ejecutar")
+            continue
+        print(f"{pagina:<34}{r['primer_render_s'] * 1000:8.1f} ms "
+              f"(+{r['import_streamlit_s'] * 1000:.0f} ms importando streamlit, "
+              f"{r['excepciones']} excepciones)")
+
+
+if __name__ == '__main__':
+    main()